@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Sequence
+
+
+# SQLite caps bound parameters per statement (999 on older builds).
+_LOOKUP_CHUNK = 500
+
+
+class HashDB:
+    """
+    On-disk cache of file digests keyed by (path, size, mtime_ns), so
+    content matching can skip files that are unchanged since an earlier run.
+    Safe to share between threads.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS hashes ("
+                "path TEXT PRIMARY KEY,"
+                "size INTEGER NOT NULL,"
+                "mtime_ns INTEGER NOT NULL,"
+                "partial_len INTEGER,"
+                "partial_hash TEXT,"
+                "full_hash TEXT)"
+            )
+            self._conn.commit()
+
+    def lookup(
+        self,
+        entries: Sequence[tuple[str, int, int]],
+    ) -> dict[str, tuple[int | None, str | None, str | None]]:
+        """
+        Returns path -> (partial_len, partial_hash, full_hash) for the
+        (path, size, mtime_ns) entries whose row still matches.
+        Rows for files that have since changed are deleted.
+        """
+        wanted = {path: (size, mtime_ns) for path, size, mtime_ns in entries}
+        paths = list(wanted)
+        found: dict[str, tuple[int | None, str | None, str | None]] = {}
+        stale: list[tuple[str]] = []
+        with self._lock:
+            for i in range(0, len(paths), _LOOKUP_CHUNK):
+                chunk = paths[i:i + _LOOKUP_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT path, size, mtime_ns, partial_len, partial_hash, full_hash "
+                    f"FROM hashes WHERE path IN ({marks})",
+                    chunk,
+                )
+                for path, size, mtime_ns, partial_len, partial_hash, full_hash in rows:
+                    if wanted[path] == (size, mtime_ns):
+                        found[path] = (partial_len, partial_hash, full_hash)
+                    else:
+                        stale.append((path,))
+            if stale:
+                self._conn.executemany("DELETE FROM hashes WHERE path = ?", stale)
+                self._conn.commit()
+        return found
+
+    def store(
+        self,
+        rows: Iterable[tuple[str, int, int, int | None, str | None, str | None]],
+    ) -> None:
+        """Upserts (path, size, mtime_ns, partial_len, partial_hash, full_hash) rows."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO hashes "
+                "(path, size, mtime_ns, partial_len, partial_hash, full_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
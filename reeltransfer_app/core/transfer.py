@@ -1,11 +1,45 @@
 from __future__ import annotations
 
+import hashlib
+import mmap
 import os
+import re
 import shlex
 import shutil
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
+from functools import cached_property
 from pathlib import Path
-from typing import Iterable, List, Literal
+from typing import Iterable, List, Literal, Sequence
+
+from reeltransfer_app.core.hashdb import HashDB
+
+
+# Metadata lookups on network shares are latency-bound, so they are fanned
+# out over a thread pool (same idea as rclone's --stat-threads).
+DEFAULT_STAT_THREADS = 32
+# Paths per pool task during a directory walk; small enough that many
+# batches are in flight at once on modest trees.
+STAT_BATCH_SIZE = 64
+
+# Content matching hashes this many leading bytes first; only files whose
+# prefixes collide are read in full. 4 KiB already separates nearly all
+# non-duplicates, larger prefixes mostly just cost I/O.
+PARTIAL_HASH_BYTES = 4096
+
+# Destination indexes are reused across Preview/Start clicks. The root mtime
+# only reflects top-level changes, so entries also expire after a short TTL.
+DST_INDEX_TTL_SEC = 5.0
+_dst_index_cache: dict[tuple[str, bool], tuple[float, float, set[str]]] = {}
+
+
+# Same character class shlex.quote leaves unquoted.
+_SAFE_ARG_RE = re.compile(r"[\w@%+=:,./-]+", re.ASCII)
 
 
 @dataclass(frozen=True)
@@ -18,7 +52,49 @@ class RoboCopyPlan:
         return ["robocopy", str(self.src), str(self.dst), *self.args]
 
     def command_string(self) -> str:
-        return " ".join(shlex.quote(part) for part in self.command())
+        return self._command_string
+
+    @cached_property
+    def _command_string(self) -> str:
+        # Most robocopy tokens need no quoting; only the rest go through shlex.
+        return " ".join(
+            part if _SAFE_ARG_RE.fullmatch(part) else shlex.quote(part)
+            for part in self.command()
+        )
+
+
+_MODE_FILES = 1 << 0
+_MODE_SUBDIRS = 1 << 1
+_MODE_MOVE = 1 << 2
+_MODE_MIRROR = 1 << 3
+_MODE_DRY_RUN = 1 << 4
+
+
+def _mode_flags(mask: int) -> tuple[str, ...]:
+    flags: list[str] = []
+    if mask & _MODE_FILES:
+        flags.append("/LEV:1")
+    elif mask & _MODE_SUBDIRS:
+        flags.append("/E")
+    if mask & _MODE_MOVE:
+        flags.append("/MOVE")
+    if mask & _MODE_MIRROR:
+        flags.append("/MIR")
+    if mask & _MODE_DRY_RUN:
+        flags.append("/L")
+    return tuple(flags)
+
+
+# Every combination of the boolean options is spelled out once at import.
+_MODE_FLAGS: dict[int, tuple[str, ...]] = {
+    mask: _mode_flags(mask) for mask in range(1 << 5)
+}
+
+_DUPLICATE_FLAGS: dict[str, tuple[str, ...]] = {
+    "skip": ("/XN", "/XO", "/XC"),
+    "rename": ("/XN", "/XO", "/XC"),
+    "overwrite": ("/IS", "/IT"),
+}
 
 
 def build_plan(
@@ -36,37 +112,33 @@ def build_plan(
     include_files: list[str] | None = None,
     include_file_list: bool = False,
     exclude_files: list[str] | None = None,
+    exclude_job: Path | None = None,
 ) -> RoboCopyPlan:
     if not src.exists():
         raise ValueError("Source does not exist.")
     if src.resolve() == dst.resolve():
         raise ValueError("Source and destination must be different.")
 
-    args: List[str] = []
-
-    if include_files:
-        args.append("/LEV:1")
-    elif include_subdirs:
-        args.append("/E")
-    if move_files:
-        args.append("/MOVE")
-    if mirror:
-        args.append("/MIR")
-    if dry_run:
-        args.append("/L")
+    mask = (
+        (_MODE_FILES if include_files else 0)
+        | (_MODE_SUBDIRS if include_subdirs else 0)
+        | (_MODE_MOVE if move_files else 0)
+        | (_MODE_MIRROR if mirror else 0)
+        | (_MODE_DRY_RUN if dry_run else 0)
+    )
+    args: List[str] = list(_MODE_FLAGS[mask])
 
     args += [f"/R:{max(retry_count, 0)}", f"/W:{max(retry_wait_sec, 0)}"]
     if multithread_count and multithread_count > 0:
         args.append(f"/MT:{multithread_count}")
 
-    if duplicate_action in {"skip", "rename"}:
-        args += ["/XN", "/XO", "/XC"]
-    elif duplicate_action == "overwrite":
-        args += ["/IS", "/IT"]
+    args += _DUPLICATE_FLAGS.get(duplicate_action, ())
     if include_files:
         args += ["/IF", *include_files]
     if exclude_files:
         args += ["/XF", *exclude_files]
+    if exclude_job is not None:
+        args.append(f"/JOB:{exclude_job}")
     if include_file_list:
         args.append("/BYTES")
     else:
@@ -76,39 +148,84 @@ def build_plan(
     return RoboCopyPlan(src=src, dst=dst, args=args)
 
 
-def estimate_transfer(
-    src: Path,
-    *,
-    include_subdirs: bool,
-    include_files: list[str] | None = None,
-    files: list[Path] | None = None,
-) -> tuple[int, int]:
+def write_exclude_job(names: Sequence[str]) -> tuple[Path | None, list[str]]:
     """
-    Returns (file_count, total_bytes)
+    Writes a temporary Robocopy job file that lists names under /XF, for
+    use with build_plan(exclude_job=...). Unlike inline /XF arguments it
+    is not bounded by the command-line length. The caller deletes it.
+
+    Robocopy reads job files as 8-bit text, and which code page it applies
+    (OEM like its console output, or ANSI) isn't documented. On Windows only
+    names that encode to the same bytes in both are written; any other name
+    could come back garbled, or lossily ('?' is a wildcard there), so it is
+    returned instead, to be passed via exclude_files.
+    Returns (job_path, unwritten_names); job_path is None when nothing fit.
     """
-    targets: Iterable[Path]
+    encoding = "oem" if is_windows() else "utf-8"
+    written: list[str] = []
+    unwritten: list[str] = []
+    for name in names:
+        (written if _fits_job_file(name, encoding) else unwritten).append(name)
+    if not written:
+        return None, unwritten
+
+    fd, path = tempfile.mkstemp(prefix="reeltransfer-", suffix=".rcj")
+    with os.fdopen(fd, "w", encoding=encoding, newline="\r\n") as f:
+        f.write("/XF\n")
+        for name in written:
+            f.write(f"\t{name}\n")
+    return Path(path), unwritten
 
-    if files:
-        targets = files
-    elif include_files:
-        targets = [src / name for name in include_files]
-    else:
-        targets = iter_source_files(src, include_subdirs=include_subdirs)
 
+def _fits_job_file(name: str, encoding: str) -> bool:
+    try:
+        data = name.encode(encoding)
+        return not is_windows() or data == name.encode("mbcs")
+    except UnicodeEncodeError:
+        return False
+
+
+def _safe_stat(path: Path | str) -> os.stat_result | None:
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def _size_batch(paths: Sequence[str]) -> tuple[int, int]:
     count = 0
     total = 0
-    for f in targets:
-        if not f.exists() or not f.is_file():
-            continue
-        try:
-            total += f.stat().st_size
+    for path in paths:
+        st = _safe_stat(path)
+        if st is not None:
             count += 1
-        except OSError:
-            continue
-
+            total += st.st_size
     return count, total
 
 
+def _parallel_stat(
+    paths: Sequence[Path | str],
+    workers: int = DEFAULT_STAT_THREADS,
+) -> list[os.stat_result | None]:
+    """
+    Stat every path, overlapping the calls on a thread pool.
+    Returns results in input order; None for paths that could not be stat'ed.
+    """
+    if workers <= 1 or len(paths) < 2:
+        return [_safe_stat(p) for p in paths]
+    with ThreadPoolExecutor(max_workers=min(workers, len(paths))) as ex:
+        return list(ex.map(_safe_stat, paths))
+
+
+class ScanCancelled(Exception):
+    """Raised by a scan whose cancel event was set while it ran."""
+
+
+def _check_cancel(cancel: threading.Event | None) -> None:
+    if cancel is not None and cancel.is_set():
+        raise ScanCancelled()
+
+
 def is_windows() -> bool:
     return os.name == "nt"
 
@@ -118,51 +235,236 @@ def iter_source_files(src: Path, include_subdirs: bool) -> Iterable[Path]:
         yield src
         return
 
-    if include_subdirs:
-        for root, _, files in os.walk(src):
-            base = Path(root)
-            for name in files:
-                yield base / name
-    else:
-        for name in os.listdir(src):
-            p = src / name
-            if p.is_file():
-                yield p
+    for entry in _scan_tree(src, recursive=include_subdirs):
+        yield Path(entry.path)
 
 
-def find_duplicates(
+def _scan_tree(
+    root: Path,
+    *,
+    recursive: bool,
+    cancel: threading.Event | None = None,
+) -> Iterable[os.DirEntry[str]]:
+    """
+    Yields a DirEntry for every file under root.
+    Entries carry the type (and on Windows the size) from the directory
+    listing, so callers don't need a separate stat per file.
+    Raises ScanCancelled before the next directory once cancel is set.
+    """
+    pending = [os.fspath(root)]
+    while pending:
+        _check_cancel(cancel)
+        current = pending.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                pending.append(entry.path)
+                        elif entry.is_file():
+                            yield entry
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+@dataclass(frozen=True)
+class TransferScan:
+    file_count: int
+    total_bytes: int
+    duplicate_count: int
+    sample: list[Path]
+    pairs: list[tuple[Path, Path]]
+    # Source paths of the duplicates relative to src, when return_rels is set.
+    rels: list[str]
+
+
+def scan_plan(
     src: Path,
-    dst: Path,
+    dst: Path | None,
     *,
     include_subdirs: bool,
+    include_files: list[str] | None = None,
+    files: list[Path] | None = None,
     sample_limit: int = 12,
     return_pairs: bool = False,
-) -> tuple[int, list[Path], list[tuple[Path, Path]]]:
+    return_rels: bool = False,
+    measure: bool = True,
+    stat_threads: int = DEFAULT_STAT_THREADS,
+    cancel: threading.Event | None = None,
+) -> TransferScan:
     """
-    Returns (count, sample list) of files that already exist in destination.
-    Duplicate is defined as: dst / relative_path exists.
+    Single pass over the source that gathers the transfer size and the
+    files already present in dst (dst / relative_path exists).
+    Pass dst=None to skip duplicate detection, measure=False to skip sizes.
+    Setting cancel aborts the walks with ScanCancelled.
     """
+    count = 0
     total = 0
+    dup_count = 0
     sample: list[Path] = []
     pairs: list[tuple[Path, Path]] = []
+    rels: list[str] = []
 
-    if not src.exists() or not dst.exists():
-        return 0, [], []
+    if files is None and include_files:
+        files = [src / name for name in include_files]
+    if files is None and src.is_file():
+        files = [src]
 
-    for f in iter_source_files(src, include_subdirs=include_subdirs):
-        try:
-            rel = f.relative_to(src)
-        except ValueError:
-            rel = f.name
-        dest_file = dst / rel
-        if dest_file.exists():
-            total += 1
+    selected: list[tuple[Path, str]] = []
+    if files:
+        # Explicit selections are stat'ed up front so missing files drop out.
+        base = os.path.join(os.fspath(files[0].parent), "")
+        for f, st in zip(files, _parallel_stat(files, workers=stat_threads)):
+            if st is None:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                count += 1
+                total += st.st_size
+            f_str = os.fspath(f)
+            if f_str.startswith(base):
+                selected.append((f, f_str[len(base):]))
+            else:
+                selected.append((f, f.name))
+        recursive = any(os.sep in rel for _, rel in selected)
+    else:
+        recursive = include_subdirs
+
+    dst_index: set[str] = set()
+    if dst is not None and dst.exists():
+        dst_index = _cached_index_tree(dst, recursive=recursive, cancel=cancel)
+
+    if not measure and not dst_index:
+        # Nothing to match against and no sizes wanted: skip the source walk.
+        return TransferScan(
+            file_count=count,
+            total_bytes=total,
+            duplicate_count=0,
+            sample=[],
+            pairs=[],
+            rels=[],
+        )
+
+    dst_str = os.fspath(dst) if dst is not None else ""
+
+    # Paths are only materialized for hits that end up in sample/pairs.
+    def _record(f: Path | str, rel: str) -> None:
+        nonlocal dup_count
+        if os.path.normcase(rel) not in dst_index:
+            return
+        dup_count += 1
+        if return_rels:
+            rels.append(rel)
+        if len(sample) < sample_limit or return_pairs:
+            dest_file = Path(os.path.join(dst_str, rel))
             if len(sample) < sample_limit:
                 sample.append(dest_file)
             if return_pairs:
-                pairs.append((f, dest_file))
+                pairs.append((Path(f), dest_file))
+
+    if files:
+        if dst_index:
+            for f, rel in selected:
+                _record(f, rel)
+    else:
+        # scandir paths are root + name, so the prefix can be sliced off.
+        prefix_len = len(os.path.join(os.fspath(src), ""))
+        # Windows listings already carry sizes. Elsewhere every size is a
+        # stat syscall, so batches are handed to one pool for the whole walk
+        # and the walk keeps listing directories while they are in flight.
+        executor = (
+            ThreadPoolExecutor(max_workers=stat_threads)
+            if measure and not is_windows() and stat_threads > 1
+            else None
+        )
+        batches: list[Future[tuple[int, int]]] = []
+        pending: list[str] = []
+        try:
+            for entry in _scan_tree(src, recursive=include_subdirs, cancel=cancel):
+                if executor is not None:
+                    pending.append(entry.path)
+                    if len(pending) >= STAT_BATCH_SIZE:
+                        batches.append(executor.submit(_size_batch, pending))
+                        pending = []
+                elif measure:
+                    try:
+                        total += entry.stat().st_size
+                        count += 1
+                    except OSError:
+                        pass
+                if dst_index:
+                    _record(entry.path, entry.path[prefix_len:])
+            if executor is not None:
+                if pending:
+                    batches.append(executor.submit(_size_batch, pending))
+                for batch in batches:
+                    batch_count, batch_total = batch.result()
+                    count += batch_count
+                    total += batch_total
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    return TransferScan(
+        file_count=count,
+        total_bytes=total,
+        duplicate_count=dup_count,
+        sample=sample,
+        pairs=pairs,
+        rels=rels,
+    )
+
+
+def estimate_transfer(
+    src: Path,
+    *,
+    include_subdirs: bool,
+    include_files: list[str] | None = None,
+    files: list[Path] | None = None,
+    stat_threads: int = DEFAULT_STAT_THREADS,
+    cancel: threading.Event | None = None,
+) -> tuple[int, int]:
+    """
+    Returns (file_count, total_bytes)
+    """
+    scan = scan_plan(
+        src,
+        None,
+        include_subdirs=include_subdirs,
+        include_files=include_files,
+        files=files,
+        stat_threads=stat_threads,
+        cancel=cancel,
+    )
+    return scan.file_count, scan.total_bytes
+
+
+def find_duplicates(
+    src: Path,
+    dst: Path,
+    *,
+    include_subdirs: bool,
+    sample_limit: int = 12,
+    return_pairs: bool = False,
+) -> tuple[int, list[Path], list[tuple[Path, Path]]]:
+    """
+    Returns (count, sample list) of files that already exist in destination.
+    Duplicate is defined as: dst / relative_path exists.
+    """
+    if not src.exists() or _is_empty_dir(dst):
+        return 0, [], []
 
-    return total, sample, pairs
+    scan = scan_plan(
+        src,
+        dst,
+        include_subdirs=include_subdirs,
+        sample_limit=sample_limit,
+        return_pairs=return_pairs,
+        measure=False,
+    )
+    return scan.duplicate_count, scan.sample, scan.pairs
 
 
 def find_duplicates_for_files(
@@ -171,35 +473,488 @@ def find_duplicates_for_files(
     *,
     sample_limit: int = 12,
     return_pairs: bool = False,
+    stat_threads: int = DEFAULT_STAT_THREADS,
 ) -> tuple[int, list[Path], list[tuple[Path, Path]]]:
-    total = 0
+    if not files or _is_empty_dir(dst):
+        return 0, [], []
+
+    scan = scan_plan(
+        files[0].parent,
+        dst,
+        include_subdirs=False,
+        files=files,
+        sample_limit=sample_limit,
+        return_pairs=return_pairs,
+        stat_threads=stat_threads,
+    )
+    return scan.duplicate_count, scan.sample, scan.pairs
+
+
+# path -> (size, mtime_ns, hex digest). Only holds digests for the match
+# in progress; HashDB is what carries them across scans.
+_hash_cache: dict[str, tuple[int, int, str]] = {}
+# path -> (size, mtime_ns, prefix length, hex digest of the prefix)
+_partial_hash_cache: dict[str, tuple[int, int, int, str]] = {}
+
+
+def _partial_hash_file(path: str, size: int, mtime_ns: int, limit: int) -> str | None:
+    cached = _partial_hash_cache.get(path)
+    if cached is not None and cached[:3] == (size, mtime_ns, limit):
+        return cached[3]
+    try:
+        with open(path, "rb") as f:
+            data = f.read(limit)
+    except OSError:
+        return None
+    digest = hashlib.sha256(data).hexdigest()
+    _partial_hash_cache[path] = (size, mtime_ns, limit, digest)
+    if size <= limit:
+        # The prefix is the whole file, so this is also its full digest.
+        _hash_cache[path] = (size, mtime_ns, digest)
+    return digest
+
+
+def _hash_file(path: str, size: int, mtime_ns: int) -> str | None:
+    cached = _hash_cache.get(path)
+    if cached is not None and cached[0] == size and cached[1] == mtime_ns:
+        return cached[2]
+
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            if size > 0:
+                # hashlib releases the GIL on large buffers, so threads overlap.
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    h.update(m)
+    except (OSError, ValueError):
+        return None
+    digest = h.hexdigest()
+    _hash_cache[path] = (size, mtime_ns, digest)
+    return digest
+
+
+def _hash_files(
+    entries: Sequence[tuple[str, int, int]],
+    workers: int,
+    limit: int = 0,
+    cancel: threading.Event | None = None,
+) -> list[str | None]:
+    """Full digests, or digests of the first `limit` bytes when limit > 0."""
+    if limit > 0:
+        def one(e: tuple[str, int, int]) -> str | None:
+            _check_cancel(cancel)
+            return _partial_hash_file(*e, limit)
+    else:
+        def one(e: tuple[str, int, int]) -> str | None:
+            _check_cancel(cancel)
+            return _hash_file(*e)
+    if workers <= 1 or len(entries) < 2:
+        return [one(e) for e in entries]
+    with ThreadPoolExecutor(max_workers=min(workers, len(entries))) as ex:
+        return list(ex.map(one, entries))
+
+
+def _sieve(
+    dst_entries: list[tuple[str, int, int]],
+    src_entries: list[tuple[str, int, int]],
+    dst_keys: Sequence[object],
+    src_keys: Sequence[object],
+) -> tuple[list[tuple[str, int, int]], list[tuple[str, int, int]]]:
+    """Keeps only the entries whose key (None = unreadable) occurs on both sides."""
+    shared = {k for k in dst_keys if k is not None} & {k for k in src_keys if k is not None}
+    return (
+        [e for e, k in zip(dst_entries, dst_keys) if k in shared],
+        [e for e, k in zip(src_entries, src_keys) if k in shared],
+    )
+
+
+def _seed_hash_caches(db: HashDB, entries: Sequence[tuple[str, int, int]]) -> None:
+    # The database is only an accelerator; if it fails, everything is rehashed.
+    try:
+        known = db.lookup(entries)
+    except sqlite3.Error:
+        return
+    meta = {path: (size, mtime_ns) for path, size, mtime_ns in entries}
+    for path, (partial_len, partial_hash, full_hash) in known.items():
+        size, mtime_ns = meta[path]
+        if partial_len and partial_hash is not None:
+            _partial_hash_cache[path] = (size, mtime_ns, partial_len, partial_hash)
+        if full_hash is not None:
+            _hash_cache[path] = (size, mtime_ns, full_hash)
+
+
+def _persist_hash_caches(db: HashDB, entries: Sequence[tuple[str, int, int]]) -> None:
+    rows: list[tuple[str, int, int, int | None, str | None, str | None]] = []
+    for path, size, mtime_ns in entries:
+        partial = _partial_hash_cache.get(path)
+        if partial is not None and partial[:2] != (size, mtime_ns):
+            partial = None
+        full = _hash_cache.get(path)
+        if full is not None and full[:2] != (size, mtime_ns):
+            full = None
+        if partial is None and full is None:
+            continue
+        rows.append((
+            path,
+            size,
+            mtime_ns,
+            partial[2] if partial else None,
+            partial[3] if partial else None,
+            full[2] if full else None,
+        ))
+    if rows:
+        try:
+            db.store(rows)
+        except sqlite3.Error:
+            pass
+
+
+def _stat_entries(paths: Sequence[str], workers: int) -> list[tuple[str, int, int]]:
+    out: list[tuple[str, int, int]] = []
+    for p, st in zip(paths, _parallel_stat(paths, workers=workers)):
+        if st is not None and stat.S_ISREG(st.st_mode):
+            out.append((p, st.st_size, st.st_mtime_ns))
+    return out
+
+
+def _stat_dir_entries(
+    entries: Sequence[os.DirEntry[str]],
+    workers: int,
+) -> list[tuple[str, int, int]]:
+    """
+    (path, size, mtime_ns) for walked files. Windows listings already carry
+    both, so no file is stat'ed again; elsewhere this is _stat_entries.
+    """
+    if not is_windows():
+        return _stat_entries([e.path for e in entries], workers)
+    out: list[tuple[str, int, int]] = []
+    for e in entries:
+        try:
+            st = e.stat()
+        except OSError:
+            continue
+        out.append((e.path, st.st_size, st.st_mtime_ns))
+    return out
+
+
+def find_duplicates_by_hash(
+    src: Path,
+    dst: Path,
+    *,
+    include_subdirs: bool,
+    files: list[Path] | None = None,
+    sample_limit: int = 12,
+    return_pairs: bool = False,
+    workers: int = DEFAULT_STAT_THREADS,
+    partial_bytes: int = PARTIAL_HASH_BYTES,
+    hash_db: HashDB | None = None,
+    cancel: threading.Event | None = None,
+) -> tuple[int, list[Path], list[tuple[Path, Path]]]:
+    """
+    Like find_duplicates, but a duplicate is any source file whose SHA-256
+    matches a file anywhere under dst, regardless of its name.
+    Candidates are narrowed by size, then by a hash of their first
+    partial_bytes (0 disables that stage); only the survivors are read in full.
+    Digests are also looked up in / written back to hash_db when given.
+    Pairs map each source file to one matching destination file.
+    Setting cancel aborts the walks and hashing with ScanCancelled.
+    """
+    dst_entries = _stat_dir_entries(list(_scan_tree(dst, recursive=True, cancel=cancel)), workers)
+    if not dst_entries:
+        return 0, [], []
+    if files is not None:
+        src_entries = _stat_entries([os.fspath(f) for f in files], workers)
+    elif src.is_file():
+        src_entries = _stat_entries([os.fspath(src)], workers)
+    elif src.exists():
+        src_entries = _stat_dir_entries(
+            list(_scan_tree(src, recursive=include_subdirs, cancel=cancel)),
+            workers,
+        )
+    else:
+        return 0, [], []
+    if not src_entries:
+        return 0, [], []
+    return _match_entries(
+        dst_entries,
+        src_entries,
+        workers=workers,
+        partial_bytes=partial_bytes,
+        sample_limit=sample_limit,
+        return_pairs=return_pairs,
+        hash_db=hash_db,
+        cancel=cancel,
+    )
+
+
+def _match_entries(
+    dst_entries: list[tuple[str, int, int]],
+    src_entries: list[tuple[str, int, int]],
+    *,
+    workers: int,
+    partial_bytes: int,
+    sample_limit: int,
+    return_pairs: bool,
+    hash_db: HashDB | None,
+    cancel: threading.Event | None,
+) -> tuple[int, list[Path], list[tuple[Path, Path]]]:
+    # Size sieve: only files whose size occurs on both sides can match, so
+    # everything else is never read. For typical media sets that is most files.
+    dst_entries, src_entries = _sieve(
+        dst_entries,
+        src_entries,
+        [e[1] for e in dst_entries],
+        [e[1] for e in src_entries],
+    )
+    if not src_entries:
+        return 0, [], []
+
+    candidates = dst_entries + src_entries
+    if hash_db is not None:
+        _seed_hash_caches(hash_db, candidates)
+    try:
+        return _match_by_hash(
+            dst_entries,
+            src_entries,
+            workers=workers,
+            partial_bytes=partial_bytes,
+            sample_limit=sample_limit,
+            return_pairs=return_pairs,
+            cancel=cancel,
+        )
+    finally:
+        if hash_db is not None:
+            _persist_hash_caches(hash_db, candidates)
+        _drop_hash_caches(candidates)
+
+
+def _drop_hash_caches(entries: Sequence[tuple[str, int, int]]) -> None:
+    # Only this call's paths, so a concurrent match keeps its own entries.
+    for path, _, _ in entries:
+        _hash_cache.pop(path, None)
+        _partial_hash_cache.pop(path, None)
+
+
+def scan_plan_by_hash(
+    src: Path,
+    dst: Path,
+    *,
+    include_subdirs: bool,
+    files: list[Path] | None = None,
+    sample_limit: int = 12,
+    workers: int = DEFAULT_STAT_THREADS,
+    partial_bytes: int = PARTIAL_HASH_BYTES,
+    hash_db: HashDB | None = None,
+    cancel: threading.Event | None = None,
+) -> TransferScan:
+    """
+    scan_plan for content matching: a duplicate is a source file whose
+    dst / relative_path exists or whose SHA-256 matches a file under dst.
+    Same-path files count even when their content differs, because Robocopy
+    would otherwise replace them. Each tree is walked once.
+    rels is always filled; pairs is not.
+    """
+    if files is None and src.is_file():
+        files = [src]
+    if files:
+        base = os.fspath(files[0].parent)
+        src_entries = _stat_entries([os.fspath(f) for f in files], workers)
+    else:
+        base = os.fspath(src)
+        src_entries = _stat_dir_entries(
+            list(_scan_tree(src, recursive=include_subdirs, cancel=cancel)),
+            workers,
+        )
+    prefix = os.path.join(base, "")
+
+    # One recursive walk of dst serves both the path index and the hashing.
+    dst_files: list[os.DirEntry[str]] = []
+    dst_index = _index_tree(dst, recursive=True, cancel=cancel, file_entries=dst_files)
+    dst_entries = _stat_dir_entries(dst_files, workers)
+
+    def _rel(path: str) -> str:
+        return path[len(prefix):] if path.startswith(prefix) else os.path.basename(path)
+
+    dst_str = os.fspath(dst)
+    rels: list[str] = []
     sample: list[Path] = []
-    pairs: list[tuple[Path, Path]] = []
+    seen: set[str] = set()
+    for path, _, _ in src_entries:
+        rel = _rel(path)
+        key = os.path.normcase(rel)
+        if key in dst_index:
+            seen.add(key)
+            rels.append(rel)
+            if len(sample) < sample_limit:
+                sample.append(Path(os.path.join(dst_str, rel)))
+
+    _, _, pairs = _match_entries(
+        dst_entries,
+        src_entries,
+        workers=workers,
+        partial_bytes=partial_bytes,
+        sample_limit=0,
+        return_pairs=True,
+        hash_db=hash_db,
+        cancel=cancel,
+    )
+    for src_file, match in pairs:
+        rel = _rel(os.fspath(src_file))
+        key = os.path.normcase(rel)
+        if key in seen:
+            continue
+        seen.add(key)
+        rels.append(rel)
+        if len(sample) < sample_limit:
+            sample.append(match)
+    return TransferScan(
+        file_count=len(src_entries),
+        total_bytes=sum(size for _, size, _ in src_entries),
+        duplicate_count=len(rels),
+        sample=sample,
+        pairs=[],
+        rels=rels,
+    )
 
-    if not files or not dst.exists():
+
+def _match_by_hash(
+    dst_entries: list[tuple[str, int, int]],
+    src_entries: list[tuple[str, int, int]],
+    *,
+    workers: int,
+    partial_bytes: int,
+    sample_limit: int,
+    return_pairs: bool,
+    cancel: threading.Event | None = None,
+) -> tuple[int, list[Path], list[tuple[Path, Path]]]:
+    if partial_bytes > 0:
+        dst_partial = _hash_files(dst_entries, workers, partial_bytes, cancel)
+        src_partial = _hash_files(src_entries, workers, partial_bytes, cancel)
+        dst_entries, src_entries = _sieve(
+            dst_entries,
+            src_entries,
+            [(e[1], d) if d is not None else None for e, d in zip(dst_entries, dst_partial)],
+            [(e[1], d) if d is not None else None for e, d in zip(src_entries, src_partial)],
+        )
+    if not src_entries:
         return 0, [], []
 
-    base = files[0].parent
-    for f in files:
-        if not f.exists():
+    by_digest: dict[str, str] = {}
+    for (path, _, _), digest in zip(dst_entries, _hash_files(dst_entries, workers, cancel=cancel)):
+        if digest is not None:
+            by_digest.setdefault(digest, path)
+
+    count = 0
+    sample: list[Path] = []
+    pairs: list[tuple[Path, Path]] = []
+    for (path, _, _), digest in zip(src_entries, _hash_files(src_entries, workers, cancel=cancel)):
+        match = by_digest.get(digest) if digest is not None else None
+        if match is None:
             continue
+        count += 1
+        if len(sample) < sample_limit:
+            sample.append(Path(match))
+        if return_pairs:
+            pairs.append((Path(path), Path(match)))
+    return count, sample, pairs
+
+
+def _is_empty_dir(path: Path) -> bool:
+    """True when path is missing/unreadable or has no entries at all."""
+    try:
+        with os.scandir(path) as it:
+            return next(it, None) is None
+    except OSError:
+        return True
+
+
+def _index_tree(
+    root: Path,
+    *,
+    recursive: bool,
+    cancel: threading.Event | None = None,
+    file_entries: list[os.DirEntry[str]] | None = None,
+) -> set[str]:
+    """
+    Returns the normcase'd relative paths of every entry under root,
+    gathered in a single directory walk. When file_entries is given, the
+    DirEntry of every file is appended to it during the same walk.
+    """
+    index: set[str] = set()
+    pending = [("", os.fspath(root))]
+    while pending:
+        _check_cancel(cancel)
+        prefix, current = pending.pop()
         try:
-            rel = f.relative_to(base)
-        except ValueError:
-            rel = f.name
-        dest_file = dst / rel
-        if dest_file.exists():
-            total += 1
-            if len(sample) < sample_limit:
-                sample.append(dest_file)
-            if return_pairs:
-                pairs.append((f, dest_file))
+            with os.scandir(current) as it:
+                for entry in it:
+                    rel = prefix + entry.name
+                    index.add(os.path.normcase(rel))
+                    if not recursive and file_entries is None:
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                pending.append((rel + os.sep, entry.path))
+                        elif file_entries is not None and entry.is_file():
+                            file_entries.append(entry)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return index
+
+
+def _cached_index_tree(
+    root: Path,
+    *,
+    recursive: bool,
+    cancel: threading.Event | None = None,
+) -> set[str]:
+    key = (os.path.normcase(os.path.abspath(root)), recursive)
+    try:
+        mtime = os.stat(root).st_mtime
+    except OSError:
+        _dst_index_cache.pop(key, None)
+        return set()
+
+    now = time.monotonic()
+    cached = _dst_index_cache.get(key)
+    if cached is not None:
+        cached_at, cached_mtime, index = cached
+        if cached_mtime == mtime and now - cached_at < DST_INDEX_TTL_SEC:
+            return index
+
+    # A cancelled walk raises here, so a partial index is never cached.
+    index = _index_tree(root, recursive=recursive, cancel=cancel)
+    _dst_index_cache[key] = (now, mtime, index)
+    return index
 
-    return total, sample, pairs
+
+def invalidate_dst_index(root: Path | None = None) -> None:
+    """
+    Drops cached destination indexes (all of them when root is None).
+    Call after anything writes to the destination.
+    """
+    if root is None:
+        _dst_index_cache.clear()
+        return
+    prefix = os.path.normcase(os.path.abspath(root))
+    for key in [k for k in _dst_index_cache if k[0] == prefix]:
+        del _dst_index_cache[key]
 
 
-def _next_available_path(dst: Path) -> Path:
-    if not dst.exists():
+def _next_available_path(dst: Path, existing: set[str] | None = None) -> Path:
+    """
+    Returns dst, or the first free "name (N).ext" sibling.
+    When existing (normcase'd names in dst.parent) is given, it is used
+    instead of hitting the filesystem and is updated with the chosen name.
+    """
+    if existing is None:
+        if not dst.exists():
+            return dst
+    elif os.path.normcase(dst.name) not in existing:
+        existing.add(os.path.normcase(dst.name))
         return dst
 
     stem = dst.stem
@@ -209,36 +964,104 @@ def _next_available_path(dst: Path) -> Path:
     i = 1
     while True:
         candidate = parent / f"{stem} ({i}){suffix}"
-        if not candidate.exists():
+        if existing is None:
+            if not candidate.exists():
+                return candidate
+        elif os.path.normcase(candidate.name) not in existing:
+            existing.add(os.path.normcase(candidate.name))
             return candidate
         i += 1
 
 
+def _list_names(folder: Path) -> set[str] | None:
+    """Normcase'd names in folder, or None when it can't be listed."""
+    try:
+        return {os.path.normcase(name) for name in os.listdir(folder)}
+    except OSError:
+        return None
+
+
+def _fast_copy(src: str, dst: str) -> None:
+    """
+    copy2 that copies data in-kernel with copy_file_range where available
+    (Linux; may reflink on Btrfs/XFS). Falls back to shutil.copy2.
+    """
+    copy_range = getattr(os, "copy_file_range", None)
+    if copy_range is None:
+        shutil.copy2(src, dst)
+        return
+
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+            remaining = os.fstat(in_fd).st_size
+            while remaining > 0:
+                sent = copy_range(in_fd, out_fd, remaining)
+                if sent == 0:
+                    # Some filesystems report 0 without copying anything;
+                    # a short copy must never be kept.
+                    break
+                remaining -= sent
+    except OSError:
+        # e.g. EXDEV/ENOSYS on older kernels or cross-filesystem copies.
+        remaining = -1
+    if remaining != 0:
+        shutil.copy2(src, dst)
+        return
+    shutil.copystat(src, dst)
+
+
 def apply_duplicate_renames(
     pairs: list[tuple[Path, Path]],
     *,
     move_files: bool,
+    workers: int = 1,
 ) -> tuple[int, list[str]]:
     """
     For duplicates, move/copy each source to a unique destination name.
-    Returns (count, errors).
+    Target names are picked up front; the moves/copies then run on up to
+    `workers` threads. Returns (count, errors).
     """
-    count = 0
     errors: list[str] = []
+    # None marks a folder that couldn't be listed; its names are probed on
+    # disk instead, since an empty set would hand back the existing file.
+    listings: dict[Path, set[str] | None] = {}
+    jobs: list[tuple[Path, Path, Path]] = []
 
     for src, dst in pairs:
         if not src.exists():
             continue
 
         try:
-            dst.parent.mkdir(parents=True, exist_ok=True)
-            final_dst = _next_available_path(dst)
-            if move_files:
-                shutil.move(str(src), str(final_dst))
+            # Parents are created and listed once; later pairs reuse the entry.
+            if dst.parent in listings:
+                existing = listings[dst.parent]
             else:
-                shutil.copy2(str(src), str(final_dst))
-            count += 1
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                existing = listings[dst.parent] = _list_names(dst.parent)
+            jobs.append((src, dst, _next_available_path(dst, existing)))
         except Exception as e:
             errors.append(f"{src} -> {dst}: {e}")
 
+    transfer = shutil.move if move_files else _fast_copy
+
+    def _do_one(src: Path, final_dst: Path) -> None:
+        transfer(str(src), str(final_dst))
+
+    count = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as ex:
+        futures = {
+            ex.submit(_do_one, src, final_dst): (src, dst)
+            for src, dst, final_dst in jobs
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+                count += 1
+            except Exception as e:
+                src, dst = futures[future]
+                errors.append(f"{src} -> {dst}: {e}")
+
+    if count:
+        invalidate_dst_index()
     return count, errors
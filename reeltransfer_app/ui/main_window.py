@@ -1,31 +1,66 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
 import re
 import shutil
-from typing import Optional, Literal, cast, Any
-
-from PySide6.QtCore import Qt, QProcess, QSettings
-from PySide6.QtGui import QAction
+import sqlite3
+import stat
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Literal, cast, Any
+
+from PySide6.QtCore import (
+    Qt, QElapsedTimer, QObject, QProcess, QRunnable, QSettings, QStandardPaths, QThreadPool, QTimer,
+    Signal, Slot
+)
+from PySide6.QtGui import QAction, QTextCursor
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QFileDialog, QLabel, QMessageBox,
-    QLineEdit, QCheckBox, QTextBrowser, QStatusBar, QSpinBox, QProgressBar
+    QLineEdit, QCheckBox, QPlainTextEdit, QStatusBar, QSpinBox, QProgressBar
 )
 
+from reeltransfer_app.core.hashdb import HashDB
 from reeltransfer_app.core.transfer import (
+    PARTIAL_HASH_BYTES,
+    RoboCopyPlan,
+    TransferScan,
     build_plan,
     is_windows,
-    find_duplicates,
-    find_duplicates_for_files,
+    scan_plan,
     estimate_transfer,
+    scan_plan_by_hash,
     apply_duplicate_renames,
+    invalidate_dst_index,
+    write_exclude_job,
 )
 
 
 APP_NAME = "ReelTransfer"
 APP_VERSION = "1.2.7"
 
+# The progress bar is repainted at most this often (~20 Hz) while streaming.
+PROGRESS_UPDATE_MS = 50
+LOG_MAX_BLOCKS = 5000
+# Storage cards refresh once typing pauses; disk usage is reused briefly.
+STORAGE_UPDATE_DEBOUNCE_MS = 250
+DISK_USAGE_TTL_SEC = 2.0
+# Duplicate scan results are reused while both roots are unchanged.
+DUP_SCAN_CACHE_TTL_SEC = 30.0
+
+
+# Cheap syntactic check so half-typed paths never reach the filesystem:
+# drive root, UNC \\server\share, POSIX root or home.
+_LOOKS_LIKE_PATH_RE = re.compile(r"^(?:[A-Za-z]:[\\/]|\\\\[^\\/]+[\\/][^\\/]+|/|~)")
+
+
+_BYTE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+# Robocopy's redirected output is in the OEM code page on Windows.
+_OUTPUT_ENCODING = "oem" if is_windows() else "utf-8"
+
 
 def _to_int(value: object, default: int) -> int:
     try:
@@ -34,6 +69,38 @@ def _to_int(value: object, default: int) -> int:
         return default
 
 
+@dataclass(frozen=True)
+class _Selection:
+    src: Path
+    dst: Path
+    files: list[Path] | None
+    include_files: list[str] | None
+
+
+class _JobSignals(QObject):
+    finished = Signal(int, object)
+
+
+class _BackgroundJob(QRunnable):
+    """
+    Runs fn on a pool thread and emits (job_id, result) when done.
+    An exception raised by fn is delivered as the result.
+    """
+
+    def __init__(self, job_id: int, fn: Callable[[], Any]) -> None:
+        super().__init__()
+        self.job_id = job_id
+        self._fn = fn
+        self.signals = _JobSignals()
+
+    def run(self) -> None:
+        try:
+            result = self._fn()
+        except Exception as e:
+            result = e
+        self.signals.finished.emit(self.job_id, result)
+
+
 class MainWindow(QMainWindow):
     def __init__(self, app) -> None:
         super().__init__()
@@ -45,17 +112,39 @@ class MainWindow(QMainWindow):
         self._process: Optional[QProcess] = None
         self._duplicate_action: Optional[Literal["ask", "skip", "overwrite", "rename"]] = None
         self._duplicate_pairs: list[tuple[Path, Path]] = []
+        self._duplicate_src_rels: list[str] = []
+        self._dupes_partial_bytes = PARTIAL_HASH_BYTES
+        self._hash_db = self._open_hash_db()
+        self._exclude_job: Optional[Path] = None
+        self._scan: Optional[TransferScan] = None
         self._source_files: list[Path] = []
+        self._jobs: dict[int, tuple[_BackgroundJob, Callable[[Any], None]]] = {}
+        self._next_job_id = 0
+        # Identifies the running scan; setting it also cancels that scan's walk.
+        self._scan_token: Optional[threading.Event] = None
+        self._disk_usage_cache: dict[str, tuple[float, tuple[int, int]]] = {}
+        # Card probes get their own small pool so a slow walk (e.g. typing a
+        # drive root) can't hold up the duplicate scan on the global pool.
+        self._card_pool = QThreadPool(self)
+        self._card_pool.setMaxThreadCount(2)
+        self._card_tokens: dict[QLabel, threading.Event] = {}
+        self._dup_scan_cache: dict[tuple, tuple[float, tuple[TransferScan, int, list[Path]]]] = {}
         self._settings = QSettings("ReelTransfer", "ReelTransfer")
         self._progress_total_files = 0
         self._progress_total_bytes = 0
+        self._progress_total_bytes_text = ""
         self._progress_copied_files = 0
         self._progress_copied_bytes = 0
-        self._output_buffer = ""
+        self._progress_timer = QElapsedTimer()
+        self._progress_timer.start()
+        self._last_progress_update_ms = -PROGRESS_UPDATE_MS
+        self._output_buffer = b""
+        self._log_streaming = False
         self._progress_enabled = True
-        self._file_line_re = re.compile(
-            r"^\s*(New File|Newer|Older|Changed)\s+([0-9,]+)\s+",
-            re.IGNORECASE,
+        # Swept over whole output chunks; Robocopy's file-class tags have
+        # fixed casing.
+        self._file_line_re: re.Pattern[bytes] = re.compile(
+            rb"(?m)^[ \t]*(?:New File|Newer|Older|Changed)[ \t]+(\d[\d,]*)[ \t]"
         )
 
         # Menu
@@ -111,10 +200,13 @@ class MainWindow(QMainWindow):
         layout.addLayout(dupes)
         self.chk_check_dupes = QCheckBox("Check for duplicates before transfer")
         self.chk_check_dupes.setChecked(True)
+        self.chk_dupes_by_content = QCheckBox("Match duplicates by content (SHA-256)")
+        self.chk_dupes_by_content.setChecked(False)
         self.chk_dry_run = QCheckBox("Dry run (/L) — no changes")
         self.chk_check_space = QCheckBox("Verify destination free space")
         self.chk_check_space.setChecked(True)
         dupes.addWidget(self.chk_check_dupes)
+        dupes.addWidget(self.chk_dupes_by_content)
         dupes.addWidget(self.chk_dry_run)
         dupes.addWidget(self.chk_check_space)
         dupes.addStretch(1)
@@ -163,8 +255,10 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.progress)
 
         # Log output
-        self.log = QTextBrowser()
-        self.log.setOpenExternalLinks(True)
+        # Plain-text log with capped scrollback so long runs stay cheap.
+        self.log = QPlainTextEdit()
+        self.log.setReadOnly(True)
+        self.log.setMaximumBlockCount(LOG_MAX_BLOCKS)
         self.log.setPlaceholderText("Robocopy output will appear here…")
         layout.addWidget(self.log, 1)
 
@@ -182,12 +276,30 @@ class MainWindow(QMainWindow):
         self.btn_clear.clicked.connect(self.log.clear)
         self.chk_mirror.toggled.connect(self._mirror_toggled)
         self.src_edit.textEdited.connect(self._src_text_edited)
-        self.src_edit.textChanged.connect(self._update_storage_cards)
-        self.dst_edit.textChanged.connect(self._update_storage_cards)
+        self._storage_timer = QTimer(self)
+        self._storage_timer.setSingleShot(True)
+        self._storage_timer.setInterval(STORAGE_UPDATE_DEBOUNCE_MS)
+        self._storage_timer.timeout.connect(self._update_storage_cards)
+        self.src_edit.textChanged.connect(self._schedule_storage_update)
+        self.dst_edit.textChanged.connect(self._schedule_storage_update)
+        self.src_edit.textChanged.connect(self._invalidate_dup_scans)
+        self.dst_edit.textChanged.connect(self._invalidate_dup_scans)
 
         self._load_settings()
         self._update_storage_cards()
 
+    @staticmethod
+    def _open_hash_db() -> Optional[HashDB]:
+        # Content digests persist across sessions so unchanged files aren't
+        # rehashed; without a writable app-data folder matching still works.
+        folder = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+        if not folder:
+            return None
+        try:
+            return HashDB(Path(folder) / "hashdb.sqlite")
+        except (OSError, sqlite3.Error):
+            return None
+
     @staticmethod
     def _extract_path_text(text: str) -> str:
         if "  (" in text:
@@ -196,16 +308,8 @@ class MainWindow(QMainWindow):
 
     def _make_storage_card(self, title: str) -> tuple[QWidget, QLabel]:
         card = QWidget()
+        card.setObjectName("storageCard")
         card.setMinimumWidth(220)
-        card.setStyleSheet(
-            "QWidget {"
-            "border: 1px solid #3a3f44;"
-            "border-radius: 6px;"
-            "padding: 6px;"
-            "background-color: #1f2329;"
-            "}"
-            "QLabel { color: #d5dbe3; }"
-        )
         layout = QVBoxLayout(card)
         layout.setContentsMargins(8, 6, 8, 6)
         title_label = QLabel(f"<b>{title}</b>")
@@ -228,7 +332,7 @@ class MainWindow(QMainWindow):
         if folder:
             self.src_edit.setText(folder)
             self._source_files = []
-            self._update_storage_cards()
+            self._schedule_storage_update()
 
     def _pick_src_files(self) -> None:
         files, _ = QFileDialog.getOpenFileNames(
@@ -242,7 +346,7 @@ class MainWindow(QMainWindow):
             self._source_files = paths
             parent = paths[0].parent
             self.src_edit.setText(f"{parent}  ({len(paths)} file(s))")
-            self._update_storage_cards()
+            self._schedule_storage_update()
 
     def _src_text_edited(self) -> None:
         if self._source_files:
@@ -252,7 +356,7 @@ class MainWindow(QMainWindow):
         folder = QFileDialog.getExistingDirectory(self, "Select destination folder", str(Path.home()))
         if folder:
             self.dst_edit.setText(folder)
-            self._update_storage_cards()
+            self._schedule_storage_update()
 
     def _mirror_toggled(self, checked: bool) -> None:
         if checked:
@@ -263,10 +367,16 @@ class MainWindow(QMainWindow):
             )
 
     def _preview(self) -> None:
-        plan = self._build_plan(for_execution=False)
+        selection = self._resolve_selection()
+        if selection is None:
+            return
+        self._duplicate_pairs = []
+        self._duplicate_src_rels = []
+        self._scan = None
+        plan = self._make_plan(selection, "ask", for_execution=False)
         if not plan:
             return
-        self.log.append(f"<b>Command:</b> {plan.command_string()}")
+        self.log.appendHtml(f"<b>Command:</b> {plan.command_string()}")
         self.statusBar().showMessage("Preview generated", 3000)
 
     def _start(self) -> None:
@@ -274,47 +384,188 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "Unsupported", "Robocopy is Windows-only.")
             return
 
-        plan = self._build_plan(for_execution=True)
+        if self._process and self._process.state() != QProcess.ProcessState.NotRunning:
+            QMessageBox.information(self, "Busy", "A transfer is already running.")
+            return
+
+        selection = self._resolve_selection()
+        if selection is None:
+            return
+
+        self._duplicate_pairs = []
+        self._duplicate_src_rels = []
+        self._scan = None
+        # A dry run (/L) changes nothing, so there is nothing to protect.
+        if not self.chk_check_dupes.isChecked() or self.chk_dry_run.isChecked():
+            self._launch(selection, "ask")
+            return
+        self._scan_duplicates(selection)
+
+    def _launch(
+        self,
+        selection: _Selection,
+        dup_action: Literal["ask", "skip", "overwrite", "rename"],
+    ) -> None:
+        self._duplicate_action = dup_action
+        plan = self._make_plan(selection, dup_action, for_execution=True)
         if not plan:
             return
 
-        if not self._preflight_check(plan.src, plan.dst):
+        if self._scan is not None:
+            self._preflight_done(plan, None, (self._scan.file_count, self._scan.total_bytes))
             return
 
-        if self._process and self._process.state() != QProcess.ProcessState.NotRunning:
-            QMessageBox.information(self, "Busy", "A transfer is already running.")
+        # No duplicate scan ran, so the size estimate walks the source here.
+        src = plan.src
+        files = self._source_files if self._source_files else None
+        include_files = [p.name for p in files] if files else None
+        include_subdirs = self.chk_subdirs.isChecked()
+        token = self._begin_scanning("Estimating transfer size…")
+        self._run_in_background(
+            lambda: estimate_transfer(
+                src,
+                include_subdirs=include_subdirs,
+                include_files=include_files,
+                files=files,
+                cancel=token,
+            ),
+            lambda result: self._preflight_done(plan, token, result),
+        )
+
+    def _preflight_done(self, plan: RoboCopyPlan, token: Optional[object], result: object) -> None:
+        if token is not None:
+            if token is not self._scan_token:
+                return
+            self._end_scanning()
+        if isinstance(result, Exception):
+            QMessageBox.critical(self, "Preflight failed", str(result))
+            return
+
+        count, total_bytes = cast(tuple[int, int], result)
+        if not self._preflight_check(plan.dst, count, total_bytes):
             return
+        self._start_process(plan)
 
-        self.log.append(f"<b>Starting:</b> {plan.command_string()}")
+    def _start_process(self, plan: RoboCopyPlan) -> None:
+        self.log.appendHtml(f"<b>Starting:</b> {plan.command_string()}")
+        self._log_streaming = False
 
         proc = QProcess(self)
         proc.setProgram(plan.command()[0])
         proc.setArguments(plan.command()[1:])
         proc.setProcessChannelMode(QProcess.ProcessChannelMode.MergedChannels)
 
-        proc.readyReadStandardOutput.connect(lambda: self._read_output(proc))
+        # Bound-method slots read the process back from self._process.
+        self._process = proc
+        proc.readyReadStandardOutput.connect(self._read_output)
         proc.finished.connect(self._on_finished)
-        proc.started.connect(lambda: self._set_running(True))
+        proc.started.connect(self._on_started)
 
         proc.start()
-        self._process = proc
+
+    def _on_started(self) -> None:
+        self._set_running(True)
 
     def _stop(self) -> None:
+        if self._scan_token is not None:
+            # Stops the walk at its next directory; a late result is dropped.
+            self._scan_token.set()
+            self._end_scanning()
+            self.statusBar().showMessage("Duplicate scan cancelled", 4000)
+            return
         if not self._process:
             return
         if self._process.state() != QProcess.ProcessState.NotRunning:
             self._process.kill()
             self.statusBar().showMessage("Transfer stopped", 4000)
 
-    def _read_output(self, proc: QProcess) -> None:
-        data = bytes(proc.readAllStandardOutput().data()).decode(errors="ignore")
+    def _run_in_background(
+        self,
+        fn: Callable[[], Any],
+        callback: Callable[[Any], None],
+        pool: Optional[QThreadPool] = None,
+    ) -> None:
+        self._next_job_id += 1
+        job = _BackgroundJob(self._next_job_id, fn)
+        job.signals.finished.connect(self._on_job_finished)
+        self._jobs[job.job_id] = (job, callback)
+        (pool or QThreadPool.globalInstance()).start(job)
+
+    @Slot(int, object)
+    def _on_job_finished(self, job_id: int, result: object) -> None:
+        entry = self._jobs.pop(job_id, None)
+        if entry is not None:
+            entry[1](result)
+
+    def _begin_scanning(self, message: str) -> threading.Event:
+        token = threading.Event()
+        self._scan_token = token
+        # Callbacks and the plan read the options live, so they must not
+        # change under a scan that was started with other values.
+        self._set_options_enabled(False)
+        self.btn_start.setEnabled(False)
+        self.btn_preview.setEnabled(False)
+        self.btn_stop.setEnabled(True)
+        self.progress.setRange(0, 0)
+        self.statusBar().showMessage(message)
+        return token
+
+    def _end_scanning(self) -> None:
+        self._scan_token = None
+        self._set_options_enabled(True)
+        self.btn_start.setEnabled(True)
+        self.btn_preview.setEnabled(True)
+        self.btn_stop.setEnabled(False)
+        self.progress.setRange(0, 100)
+        self.statusBar().clearMessage()
+
+    def _set_options_enabled(self, enabled: bool) -> None:
+        for widget in (
+            self.chk_subdirs,
+            self.chk_move,
+            self.chk_mirror,
+            self.chk_check_dupes,
+            self.chk_dupes_by_content,
+            self.chk_dry_run,
+            self.chk_check_space,
+            self.spin_retries,
+            self.spin_wait,
+            self.spin_threads,
+        ):
+            widget.setEnabled(enabled)
+
+    def _read_output(self) -> None:
+        proc = self._process
+        if proc is None:
+            return
+        # Progress parsing works on the raw bytes; only the log needs text.
+        data = bytes(proc.readAllStandardOutput().data())
         if data:
-            self.log.append(data.replace("\n", "<br>"))
+            self._append_log_text(data.decode(_OUTPUT_ENCODING, "ignore"))
             if self._progress_enabled:
                 self._consume_output_lines(data)
 
+    def _append_log_text(self, text: str) -> None:
+        # Process output is streamed in as plain text at the end of the
+        # document, so chunks don't go through the HTML parser.
+        bar = self.log.verticalScrollBar()
+        at_bottom = bar.value() >= bar.maximum()
+        cursor = QTextCursor(self.log.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        if not self._log_streaming:
+            if not cursor.atStart():
+                cursor.insertBlock()
+            self._log_streaming = True
+        cursor.insertText(text.replace("\r", ""))
+        if at_bottom:
+            bar.setValue(bar.maximum())
+
     def _on_finished(self, exit_code: int, _status) -> None:
         self._set_running(False)
+        # Robocopy (and any auto-rename below) changed the destination.
+        invalidate_dst_index()
+        self._invalidate_dup_scans()
+        self._discard_exclude_job()
 
         # Robocopy exit codes: 0-7 are success/warnings, >=8 is failure
         if exit_code >= 8:
@@ -332,6 +583,7 @@ class MainWindow(QMainWindow):
             count, errors = apply_duplicate_renames(
                 self._duplicate_pairs,
                 move_files=self.chk_move.isChecked(),
+                workers=self.spin_threads.value(),
             )
             if errors:
                 preview = "\n".join(errors[:10])
@@ -351,34 +603,136 @@ class MainWindow(QMainWindow):
             self.progress.setValue(0)
             self.progress.setFormat("Progress: 0%")
 
-    def _choose_duplicate_action(
-        self,
-        src: Path,
-        dst: Path,
-        files: Optional[list[Path]] = None,
-    ) -> Optional[str]:
-        if not self.chk_check_dupes.isChecked():
-            return "ask"
-
-        if files:
-            count, sample, pairs = find_duplicates_for_files(
-                files,
-                dst,
-                sample_limit=10,
-                return_pairs=True,
-            )
-        else:
-            count, sample, pairs = find_duplicates(
+    def _scan_duplicates(self, selection: _Selection) -> None:
+        src, dst, files = selection.src, selection.dst, selection.files
+        include_subdirs = self.chk_subdirs.isChecked()
+        by_content = self.chk_dupes_by_content.isChecked()
+        partial_bytes = self._dupes_partial_bytes
+        hash_db = self._hash_db
+
+        # Runs on the thread pool, so it only sees the values captured above.
+        def work(cancel: threading.Event) -> tuple[TransferScan, int, list[Path]]:
+            if by_content:
+                # Same-path files are kept alongside the content matches, so
+                # a differing file at the same path is never overwritten silently.
+                scan = scan_plan_by_hash(
+                    src,
+                    dst,
+                    include_subdirs=include_subdirs,
+                    files=files,
+                    sample_limit=10,
+                    partial_bytes=partial_bytes,
+                    hash_db=hash_db,
+                    cancel=cancel,
+                )
+                return scan, scan.duplicate_count, scan.sample
+            # Sizes are gathered in the same pass so the preflight check can
+            # reuse them, and the relative paths so Skip needs no second pass.
+            scan = scan_plan(
                 src,
                 dst,
-                include_subdirs=self.chk_subdirs.isChecked(),
+                include_subdirs=include_subdirs,
+                files=files,
                 sample_limit=10,
-                return_pairs=True,
+                return_rels=True,
+                cancel=cancel,
             )
+            return scan, scan.duplicate_count, scan.sample
+
+        key = self._dup_scan_key(selection, include_subdirs, by_content)
+        cached = self._dup_scan_cache.get(key) if key is not None else None
+        token = self._begin_scanning("Scanning for duplicates…")
+        if cached is not None and time.monotonic() - cached[0] < DUP_SCAN_CACHE_TTL_SEC:
+            self._on_duplicates_scanned(token, selection, cached[1])
+            return
+
+        def done(result: object) -> None:
+            if key is not None and not isinstance(result, Exception):
+                self._dup_scan_cache[key] = (
+                    time.monotonic(),
+                    cast(tuple[TransferScan, int, list[Path]], result),
+                )
+            self._on_duplicates_scanned(token, selection, result)
+
+        self._run_in_background(lambda: work(token), done)
+
+    @staticmethod
+    def _dup_scan_key(selection: _Selection, include_subdirs: bool, by_content: bool) -> Optional[tuple]:
+        try:
+            src_mtime = os.stat(selection.src).st_mtime_ns
+            dst_mtime = os.stat(selection.dst).st_mtime_ns
+        except OSError:
+            return None
+        files = tuple(os.fspath(f) for f in selection.files) if selection.files else None
+        return (
+            os.fspath(selection.src),
+            os.fspath(selection.dst),
+            include_subdirs,
+            by_content,
+            files,
+            src_mtime,
+            dst_mtime,
+        )
+
+    def _invalidate_dup_scans(self) -> None:
+        self._dup_scan_cache.clear()
+
+    def _on_duplicates_scanned(self, token: object, selection: _Selection, result: object) -> None:
+        if token is not self._scan_token:
+            return
+        self._end_scanning()
+        if isinstance(result, Exception):
+            QMessageBox.critical(self, "Duplicate check failed", str(result))
+            return
+
+        scan, count, sample = cast(tuple[TransferScan, int, list[Path]], result)
+        self._scan = scan
         if count == 0:
-            self._duplicate_pairs = []
-            return "ask"
+            self._launch(selection, "ask")
+            return
 
+        # Content matches can live under another name or folder, so there is
+        # no same-path destination file for Auto-rename to rename around.
+        dup_action = self._choose_duplicate_action(
+            count,
+            sample,
+            allow_rename=not self.chk_dupes_by_content.isChecked(),
+        )
+        if dup_action is None:
+            return
+        if dup_action == "overwrite":
+            self._launch(selection, dup_action)
+            return
+        if dup_action == "skip":
+            # The dialog scan already collected the /XF paths.
+            self._duplicate_src_rels = scan.rels
+            self._launch(selection, dup_action)
+            return
+
+        # Auto-rename needs the full pair list; build it only now.
+        token = self._begin_scanning("Collecting duplicates…")
+        job = self._pairs_job(selection)
+        self._run_in_background(
+            lambda: job(token),
+            lambda result: self._on_duplicate_pairs(token, selection, result),
+        )
+
+    def _on_duplicate_pairs(self, token: object, selection: _Selection, result: object) -> None:
+        if token is not self._scan_token:
+            return
+        self._end_scanning()
+        if isinstance(result, Exception):
+            QMessageBox.critical(self, "Duplicate check failed", str(result))
+            return
+        self._duplicate_pairs = cast(list[tuple[Path, Path]], result)
+        self._launch(selection, "rename")
+
+    def _choose_duplicate_action(
+        self,
+        count: int,
+        sample: list[Path],
+        allow_rename: bool = True,
+    ) -> Optional[Literal["skip", "overwrite", "rename"]]:
         preview = "\n".join(str(p) for p in sample)
         if count > len(sample):
             preview += f"\n...and {count - len(sample)} more"
@@ -394,26 +748,46 @@ class MainWindow(QMainWindow):
         box.setText(msg)
         btn_skip = box.addButton("Skip existing", QMessageBox.ButtonRole.AcceptRole)
         btn_overwrite = box.addButton("Overwrite existing", QMessageBox.ButtonRole.DestructiveRole)
-        btn_rename = box.addButton("Auto-rename duplicates", QMessageBox.ButtonRole.ActionRole)
-        btn_cancel = box.addButton("Cancel", QMessageBox.ButtonRole.RejectRole)
+        btn_rename = None
+        if allow_rename:
+            btn_rename = box.addButton("Auto-rename duplicates", QMessageBox.ButtonRole.ActionRole)
+        box.addButton("Cancel", QMessageBox.ButtonRole.RejectRole)
         box.exec()
 
         clicked = box.clickedButton()
         if clicked == btn_skip:
-            self._duplicate_pairs = pairs
             return "skip"
         if clicked == btn_overwrite:
-            self._duplicate_pairs = []
             return "overwrite"
-        if clicked == btn_rename:
-            self._duplicate_pairs = pairs
+        if btn_rename is not None and clicked == btn_rename:
             return "rename"
-        if clicked == btn_cancel:
-            self._duplicate_pairs = []
-            return None
         return None
 
-    def _build_plan(self, *, for_execution: bool):
+    def _pairs_job(
+        self,
+        selection: _Selection,
+    ) -> Callable[[threading.Event], list[tuple[Path, Path]]]:
+        src, dst, files = selection.src, selection.dst, selection.files
+        include_subdirs = self.chk_subdirs.isChecked()
+
+        # Only Auto-rename gets here, and it is never offered in content mode,
+        # so the (src, dst) pairs are always path matches.
+        def work(cancel: threading.Event) -> list[tuple[Path, Path]]:
+            scan = scan_plan(
+                src,
+                dst,
+                include_subdirs=include_subdirs,
+                files=files,
+                sample_limit=0,
+                return_pairs=True,
+                measure=False,
+                cancel=cancel,
+            )
+            return scan.pairs
+
+        return work
+
+    def _resolve_selection(self) -> Optional[_Selection]:
         src_text = self.src_edit.text().strip()
         dst_text = self.dst_edit.text().strip()
 
@@ -424,55 +798,60 @@ class MainWindow(QMainWindow):
         src = Path(src_text).expanduser()
         dst = Path(dst_text).expanduser()
 
-        include_files: list[str] | None = None
-        files: list[Path] | None = None
+        if not self._source_files:
+            return _Selection(src=src, dst=dst, files=None, include_files=None)
 
-        if self._source_files:
-            files = self._source_files
-            base = files[0].parent
-            if any(p.parent != base for p in files):
-                QMessageBox.warning(
-                    self,
-                    "Invalid Selection",
-                    "Please select files from the same folder.",
-                )
-                return None
-            if self.chk_mirror.isChecked():
-                QMessageBox.warning(
-                    self,
-                    "Mirror not supported",
-                    "Mirror mode is not supported when selecting files.",
-                )
-                return None
-            src = base
-            include_files = [p.name for p in files]
+        files = self._source_files
+        if len({os.path.dirname(p) for p in files}) > 1:
+            QMessageBox.warning(
+                self,
+                "Invalid Selection",
+                "Please select files from the same folder.",
+            )
+            return None
+        if self.chk_mirror.isChecked():
+            QMessageBox.warning(
+                self,
+                "Mirror not supported",
+                "Mirror mode is not supported when selecting files.",
+            )
+            return None
+        return _Selection(
+            src=files[0].parent,
+            dst=dst,
+            files=files,
+            include_files=[p.name for p in files],
+        )
 
-        if for_execution:
-            dup_action = self._choose_duplicate_action(src, dst, files)
-            if dup_action is None:
+    def _make_plan(
+        self,
+        selection: _Selection,
+        dup_action: Literal["ask", "skip", "overwrite", "rename"],
+        *,
+        for_execution: bool,
+    ):
+        self._discard_exclude_job()
+        exclude_files: list[str] = []
+        if for_execution and dup_action == "skip" and self._duplicate_src_rels:
+            # Every skipped file goes into a job file, so none are dropped to
+            # keep the command line short.
+            try:
+                self._exclude_job, exclude_files = write_exclude_job(self._duplicate_src_rels)
+            except OSError as e:
+                QMessageBox.critical(self, "Invalid Setup", f"Could not write exclude list: {e}")
                 return None
-        else:
-            dup_action = "ask"
-            self._duplicate_pairs = []
-        dup_action = cast(Literal["ask", "skip", "overwrite", "rename"], dup_action)
-        self._duplicate_action = dup_action
-
-        exclude_files: list[str] | None = None
-        if for_execution and dup_action == "skip" and self._duplicate_pairs:
-            relative_paths: list[str] = []
-            for src_file, _ in self._duplicate_pairs:
-                try:
-                    rel = src_file.relative_to(src)
-                except ValueError:
-                    rel = Path(src_file.name)
-                relative_paths.append(str(rel))
-            max_excludes = 200
-            exclude_files = relative_paths[:max_excludes]
+            if exclude_files:
+                # Not safe in the 8-bit job file; QProcess passes these as
+                # Unicode arguments instead.
+                self.log.appendHtml(
+                    f"<b>Warning:</b> {len(exclude_files)} skipped file name(s) can't be "
+                    "stored in the exclude job file and are passed on the command line."
+                )
 
         try:
             return build_plan(
-                src,
-                dst,
+                selection.src,
+                selection.dst,
                 include_subdirs=self.chk_subdirs.isChecked(),
                 move_files=self.chk_move.isChecked(),
                 mirror=self.chk_mirror.isChecked(),
@@ -481,32 +860,34 @@ class MainWindow(QMainWindow):
                 retry_wait_sec=self.spin_wait.value(),
                 multithread_count=self.spin_threads.value(),
                 duplicate_action=dup_action,
-                include_files=include_files,
+                include_files=selection.include_files,
                 include_file_list=for_execution,
-                exclude_files=exclude_files,
+                exclude_files=exclude_files or None,
+                exclude_job=self._exclude_job,
             )
         except Exception as e:
             QMessageBox.critical(self, "Invalid Setup", str(e))
             return None
 
-    def _preflight_check(self, src: Path, dst: Path) -> bool:
-        files = self._source_files if self._source_files else None
-        include_files = [p.name for p in files] if files else None
-
-        count, total_bytes = estimate_transfer(
-            src,
-            include_subdirs=self.chk_subdirs.isChecked(),
-            include_files=include_files,
-            files=files,
-        )
+    def _discard_exclude_job(self) -> None:
+        if self._exclude_job is None:
+            return
+        try:
+            self._exclude_job.unlink()
+        except OSError:
+            pass
+        self._exclude_job = None
 
+    def _preflight_check(self, dst: Path, count: int, total_bytes: int) -> bool:
         self._progress_total_files = count
         self._progress_total_bytes = total_bytes
+        self._progress_total_bytes_text = self._format_bytes(total_bytes)
         self._progress_copied_files = 0
         self._progress_copied_bytes = 0
+        self._last_progress_update_ms = -PROGRESS_UPDATE_MS
         if count > 0:
             size_mb = total_bytes / (1024 * 1024)
-            self.log.append(f"<b>Preflight:</b> {count} file(s), ~{size_mb:,.2f} MB")
+            self.log.appendHtml(f"<b>Preflight:</b> {count} file(s), ~{size_mb:,.2f} MB")
 
         if self.chk_check_space.isChecked():
             try:
@@ -530,7 +911,7 @@ class MainWindow(QMainWindow):
                         f"Free: {free_text}",
                     )
             except Exception:
-                self.log.append("<b>Preflight:</b> Unable to check free space.")
+                self.log.appendHtml("<b>Preflight:</b> Unable to check free space.")
 
         if self.chk_dry_run.isChecked():
             self._progress_enabled = False
@@ -542,92 +923,146 @@ class MainWindow(QMainWindow):
 
         return True
 
+    def _schedule_storage_update(self) -> None:
+        self._storage_timer.start()
+
     def _update_storage_cards(self) -> None:
         src_text = self._extract_path_text(self.src_edit.text())
         dst_text = self._extract_path_text(self.dst_edit.text())
         self._update_source_size_card_value(self.src_storage_value, src_text)
         self._update_storage_card_value(self.dst_storage_value, dst_text)
 
+    def _probe_card(
+        self,
+        label: QLabel,
+        work: Callable[[threading.Event], Optional[str]],
+    ) -> None:
+        """
+        Runs a filesystem probe for a card on the card pool; the label keeps
+        its current text until the newest probe for it reports back.
+        Starting a probe cancels the previous one for the same label.
+        """
+        self._cancel_card_probe(label)
+        cancel = threading.Event()
+        self._card_tokens[label] = cancel
+
+        def done(result: object) -> None:
+            if self._card_tokens.get(label) is not cancel:
+                return
+            if isinstance(result, Exception) or result is None:
+                label.setText("Unavailable")
+            else:
+                label.setText(cast(str, result))
+
+        self._run_in_background(lambda: work(cancel), done, self._card_pool)
+
+    def _cancel_card_probe(self, label: QLabel) -> None:
+        cancel = self._card_tokens.pop(label, None)
+        if cancel is not None:
+            cancel.set()
+
     def _update_source_size_card_value(self, label: QLabel, path_text: str) -> None:
         files = self._source_files if self._source_files else None
+        include_subdirs = self.chk_subdirs.isChecked()
+        format_bytes = self._format_bytes
         if files:
-            count, total_bytes = estimate_transfer(
-                files[0].parent,
-                include_subdirs=self.chk_subdirs.isChecked(),
-                files=files,
-            )
-            label.setText(f"{self._format_bytes(total_bytes)} ({count} file(s))")
+            def size_files(cancel: threading.Event) -> Optional[str]:
+                count, total_bytes = estimate_transfer(
+                    files[0].parent,
+                    include_subdirs=include_subdirs,
+                    files=files,
+                    cancel=cancel,
+                )
+                return f"{format_bytes(total_bytes)} ({count} file(s))"
+
+            self._probe_card(label, size_files)
             return
 
         if not path_text:
+            self._cancel_card_probe(label)
             label.setText("—")
             return
-
-        path = Path(path_text).expanduser()
-        if not path.exists():
+        if not _LOOKS_LIKE_PATH_RE.match(path_text):
+            self._cancel_card_probe(label)
             label.setText("Unavailable")
             return
-        if path.is_file():
+
+        path = Path(path_text).expanduser()
+
+        def size_path(cancel: threading.Event) -> Optional[str]:
+            # One stat answers exists/is_file/size; directories are sized by
+            # the scandir walk, which reuses each DirEntry's cached metadata.
             try:
-                size = path.stat().st_size
-                label.setText(f"{self._format_bytes(size)} (1 file)")
+                st = os.stat(path)
             except OSError:
-                label.setText("Unavailable")
-            return
+                return None
+            if stat.S_ISREG(st.st_mode):
+                return f"{format_bytes(st.st_size)} (1 file)"
+            count, total_bytes = estimate_transfer(
+                path,
+                include_subdirs=include_subdirs,
+                cancel=cancel,
+            )
+            return f"{format_bytes(total_bytes)} ({count} file(s))"
 
-        count, total_bytes = estimate_transfer(
-            path,
-            include_subdirs=self.chk_subdirs.isChecked(),
-        )
-        label.setText(f"{self._format_bytes(total_bytes)} ({count} file(s))")
+        self._probe_card(label, size_path)
 
     def _update_storage_card_value(self, label: QLabel, path_text: str) -> None:
         if not path_text:
+            self._cancel_card_probe(label)
             label.setText("—")
             return
-        path = Path(path_text).expanduser()
-        if not path.exists():
+        if not _LOOKS_LIKE_PATH_RE.match(path_text):
+            self._cancel_card_probe(label)
             label.setText("Unavailable")
             return
-        if path.is_file():
-            path = path.parent
-        try:
-            usage = shutil.disk_usage(path)
-            label.setText(
-                f"{self._format_bytes(usage.free)} free / {self._format_bytes(usage.total)} total"
-            )
-        except Exception:
-            label.setText("Unavailable")
 
-    def _consume_output_lines(self, data: str) -> None:
-        self._output_buffer += data
-        lines = self._output_buffer.splitlines(keepends=True)
-        if not lines:
+        path = Path(path_text).expanduser()
+        key = str(path)
+        format_bytes = self._format_bytes
+        cached = self._disk_usage_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < DISK_USAGE_TTL_SEC:
+            free, total = cached[1]
+            self._cancel_card_probe(label)
+            label.setText(f"{format_bytes(free)} free / {format_bytes(total)} total")
             return
-        if not lines[-1].endswith("\n") and not lines[-1].endswith("\r"):
-            self._output_buffer = lines[-1]
-            lines = lines[:-1]
-        else:
-            self._output_buffer = ""
 
-        for line in lines:
-            self._update_progress_from_line(line.strip())
+        cache = self._disk_usage_cache
 
-    def _update_progress_from_line(self, line: str) -> None:
-        if not line:
-            return
-        match = self._file_line_re.match(line)
-        if not match:
+        def usage(cancel: threading.Event) -> Optional[str]:
+            # exists() alone can stall for seconds on an unreachable share.
+            if not path.exists():
+                return None
+            target = path.parent if path.is_file() else path
+            du = shutil.disk_usage(target)
+            cache[key] = (time.monotonic(), (du.free, du.total))
+            return f"{format_bytes(du.free)} free / {format_bytes(du.total)} total"
+
+        self._probe_card(label, usage)
+
+    def _consume_output_lines(self, data: bytes) -> None:
+        # Robocopy ends lines with \r\n (/NP suppresses bare-\r updates), so
+        # everything up to the last \n is complete.
+        head, sep, tail = (self._output_buffer + data).rpartition(b"\n")
+        self._output_buffer = tail
+        if not sep:
             return
-        size_text = match.group(2).replace(",", "")
-        try:
-            size = int(size_text)
-        except ValueError:
-            size = 0
 
-        self._progress_copied_files += 1
-        self._progress_copied_bytes += max(size, 0)
-        self._update_progress()
+        # One regex sweep over every complete line in the chunk.
+        files = 0
+        copied = 0
+        for match in self._file_line_re.finditer(head):
+            files += 1
+            copied += int(match.group(1).translate(None, b","))
+        self._progress_copied_files += files
+        self._progress_copied_bytes += copied
+
+        # Counters move per chunk; the bar is only repainted on a throttle,
+        # so any later chunk also flushes an update skipped earlier.
+        now = self._progress_timer.elapsed()
+        if now - self._last_progress_update_ms >= PROGRESS_UPDATE_MS:
+            self._last_progress_update_ms = now
+            self._update_progress()
 
     def _update_progress(self, *, final: bool = False) -> None:
         total_bytes = self._progress_total_bytes
@@ -639,7 +1074,7 @@ class MainWindow(QMainWindow):
             percent = min(100, int((copied_bytes / total_bytes) * 100))
             self.progress.setValue(percent)
             self.progress.setFormat(
-                f"Progress: {percent}% ({self._format_bytes(copied_bytes)} / {self._format_bytes(total_bytes)})"
+                f"Progress: {percent}% ({self._format_bytes(copied_bytes)} / {self._progress_total_bytes_text})"
             )
         elif total_files > 0:
             percent = min(100, int((copied_files / total_files) * 100))
@@ -657,13 +1092,9 @@ class MainWindow(QMainWindow):
 
     @staticmethod
     def _format_bytes(value: int) -> str:
-        units = ["B", "KB", "MB", "GB", "TB"]
-        size = float(value)
-        for unit in units:
-            if size < 1024 or unit == units[-1]:
-                return f"{size:,.2f} {unit}"
-            size /= 1024
-        return f"{size:,.2f} TB"
+        # The unit is picked from the bit length instead of dividing in a loop.
+        index = min(max(value.bit_length() - 1, 0) // 10, len(_BYTE_UNITS) - 1)
+        return f"{value / (1 << (10 * index)):,.2f} {_BYTE_UNITS[index]}"
 
     def _load_settings(self) -> None:
         self.src_edit.setText(str(self._settings.value("src", "")))
@@ -672,6 +1103,9 @@ class MainWindow(QMainWindow):
         self.chk_move.setChecked(bool(self._settings.value("move", True)))
         self.chk_mirror.setChecked(bool(self._settings.value("mirror", False)))
         self.chk_check_dupes.setChecked(bool(self._settings.value("dupes", True)))
+        self.chk_dupes_by_content.setChecked(
+            cast(bool, self._settings.value("dupes_by_content", False, type=bool))
+        )
         self.chk_dry_run.setChecked(bool(self._settings.value("dry_run", False)))
         self.chk_check_space.setChecked(bool(self._settings.value("check_space", True)))
         retries_val = self._settings.value("retries", 1)
@@ -680,6 +1114,10 @@ class MainWindow(QMainWindow):
         self.spin_retries.setValue(_to_int(retries_val, 1))
         self.spin_wait.setValue(_to_int(wait_val, 1))
         self.spin_threads.setValue(_to_int(threads_val, 4))
+        # Hidden tuning knob (no UI): prefix size hashed before full content
+        # matching; 0 hashes whole files straight away.
+        partial_val = self._settings.value("dupes_partial_bytes", PARTIAL_HASH_BYTES)
+        self._dupes_partial_bytes = max(0, _to_int(partial_val, PARTIAL_HASH_BYTES))
 
     def closeEvent(self, event) -> None:
         self._settings.setValue("src", self.src_edit.text())
@@ -688,9 +1126,20 @@ class MainWindow(QMainWindow):
         self._settings.setValue("move", self.chk_move.isChecked())
         self._settings.setValue("mirror", self.chk_mirror.isChecked())
         self._settings.setValue("dupes", self.chk_check_dupes.isChecked())
+        self._settings.setValue("dupes_by_content", self.chk_dupes_by_content.isChecked())
         self._settings.setValue("dry_run", self.chk_dry_run.isChecked())
         self._settings.setValue("check_space", self.chk_check_space.isChecked())
         self._settings.setValue("retries", self.spin_retries.value())
         self._settings.setValue("wait", self.spin_wait.value())
         self._settings.setValue("threads", self.spin_threads.value())
+        # setValue only updates QSettings' in-memory cache; flush it once here.
+        self._settings.sync()
+        self._discard_exclude_job()
+        for label in list(self._card_tokens):
+            self._cancel_card_probe(label)
+        if self._scan_token is not None:
+            self._scan_token.set()
+        if self._hash_db is not None:
+            self._hash_db.close()
+            self._hash_db = None
         super().closeEvent(event)
@@ -21,8 +21,9 @@ def dark_palette() -> QPalette:
     return p
 
 
-def dark_stylesheet() -> str:
-    return """
+# Built once at import; app.setStyleSheet parses it a single time for the
+# whole widget tree (storage cards included, via #storageCard).
+_DARK_STYLESHEET = """
     QWidget {
         color: #E8E8EE;
         font-size: 14px;
@@ -33,7 +34,7 @@ def dark_stylesheet() -> str:
         background-color: #18181C;
     }
 
-    QLineEdit, QTextBrowser, QSpinBox {
+    QLineEdit, QPlainTextEdit, QSpinBox {
         background-color: #141418;
         border: 1px solid #2B2B33;
         border-radius: 8px;
@@ -45,7 +46,7 @@ def dark_stylesheet() -> str:
         padding-right: 26px;
     }
 
-    QLineEdit:focus, QTextBrowser:focus, QSpinBox:focus {
+    QLineEdit:focus, QPlainTextEdit:focus, QSpinBox:focus {
         border: 1px solid #547EFF;
     }
 
@@ -152,7 +153,7 @@ def dark_stylesheet() -> str:
         border-top: 1px solid #2B2B33;
     }
 
-    QTextBrowser {
+    QPlainTextEdit {
         border-radius: 10px;
         line-height: 1.4;
     }
@@ -177,4 +178,19 @@ def dark_stylesheet() -> str:
         height: 0;
         subcontrol-origin: margin;
     }
+
+    QWidget#storageCard, QWidget#storageCard QWidget {
+        border: 1px solid #3a3f44;
+        border-radius: 6px;
+        padding: 6px;
+        background-color: #1f2329;
+    }
+
+    QWidget#storageCard QLabel {
+        color: #d5dbe3;
+    }
     """
+
+
+def dark_stylesheet() -> str:
+    return _DARK_STYLESHEET